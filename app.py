@@ -1,46 +1,42 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Measure how long the module imports take so cold starts can be tracked
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import joblib
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 import numpy as np
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Literal
+import hmac
 import json
-from fastapi.encoders import jsonable_encoder
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env if present
-load_dotenv()
-
-# Initialize FastAPI app
-app = FastAPI(
-    title="Grinch Bot Detector API",
-    description="API for detecting bot behavior on e-commerce websites",
-    version="1.0.0"
-)
-
-# Add CORS middleware to allow requests from Chrome extension
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow requests from any origin (important for local testing)
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Load model and encoder using environment variables
-MODEL_PATH = os.getenv("MODEL_PATH", "rf_bot_model.pkl")
-ENCODER_PATH = os.getenv("ENCODER_PATH", "scroll_behavior_encoder.pkl")
-try:
-    model = joblib.load(MODEL_PATH)
-    encoder = joblib.load(ENCODER_PATH)
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-    encoder = None
-
-# Create a global variable to store the latest session data for Streamlit
-latest_session = None
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+# Only covers the imports above; create_app() records the full cold start
+MODULE_IMPORT_SEC = time.perf_counter() - _IMPORT_START
+
+# Representative sessions (human-like and bot-like) used to warm up the model
+# before the app reports ready. Same feature order as SessionData, except that
+# scroll behavior is given as a raw label so the encoder gets warmed up too.
+WARMUP_SESSIONS = [
+    [48.14, 226.97, 0.949, 37.49, "long", 1, 60.12],
+    [4.36, 827.56, 0.286, 1.98, "none", 0, 3.62],
+    [6.75, 912.28, 0.124, 3.61, "none", 1, 1.31],
+    [3.1, 3500.0, 0.28, 69.0, "none", 1, 7.7],
+]
+
+# Upper bounds on one /events batch and on session keys, enforced by EventBatch
+MAX_EVENTS_PER_BATCH = 5000
+MAX_SESSION_KEY_LENGTH = 128
+# Event timestamps are client milliseconds (epoch or page-relative), and
+# positions/scroll deltas are pixels; anything outside these bounds is rejected
+MAX_EVENT_T_MS = 1e13
+MAX_EVENT_PX = 1e6
 
 class BehaviorData(BaseModel):
     mouse_movement: float
@@ -60,6 +56,23 @@ class SessionData(BaseModel):
     captcha_success: int
     form_fill_time_sec: float
 
+class InteractionEvent(BaseModel):
+    type: Literal["move", "key", "scroll", "click", "captcha", "submit"]
+    t: float = Field(allow_inf_nan=False, ge=0, le=MAX_EVENT_T_MS)
+    x: Optional[float] = Field(None, allow_inf_nan=False, ge=-MAX_EVENT_PX, le=MAX_EVENT_PX)
+    y: Optional[float] = Field(None, allow_inf_nan=False, ge=-MAX_EVENT_PX, le=MAX_EVENT_PX)
+    dy: Optional[float] = Field(None, allow_inf_nan=False, ge=-MAX_EVENT_PX, le=MAX_EVENT_PX)
+    success: Optional[Literal[0, 1]] = None
+
+class EventBatch(BaseModel):
+    session_key: str = Field(min_length=1, max_length=MAX_SESSION_KEY_LENGTH)
+    events: List[InteractionEvent] = Field(max_length=MAX_EVENTS_PER_BATCH)
+
+class EventIngestResponse(BaseModel):
+    session_key: str
+    events_accepted: int
+    total_events: int
+
 class PredictionResponse(BaseModel):
     is_bot: bool
     probability: float
@@ -72,197 +85,474 @@ class SessionPredictionResponse(BaseModel):
     confidence_metrics: Dict[str, float]
     risk_factors: List[str]
     session_id: str
+    fingerprint_frequency: int = 0
 
-@app.get("/")
-async def root():
-    """Health check endpoint"""
-    return {"status": "online", "model_loaded": model is not None}
-
-@app.post("/predict", response_model=PredictionResponse)
-async def predict_bot(data: BehaviorData):
+def load_artifacts(state):
     """
-    Predict whether the behavior is from a bot or human
+    Load the model and encoder, then run representative predictions so the
+    first real request does not pay the one-time warm-up costs.
+    Marks the app as ready when done.
     """
-    if model is None or encoder is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
+    start = time.perf_counter()
+
+    # Heavy or rarely used libraries are only imported here, off the import path
+    import joblib
+    import pytz
+    state.tz = pytz.timezone('Asia/Kolkata')
 
     try:
-        # Encode scroll behavior
-        scroll_encoded = encoder.transform([data.scroll_behavior])[0]
-
-        # Prepare features in the correct order
-        features = np.array([[
-            data.mouse_movement,
-            data.typing_speed,
-            data.click_pattern,
-            data.time_spent,
-            scroll_encoded,
-            data.captcha_success,
-            data.form_fill_time
-        ]])
-
-        # Get prediction and probability
-        is_bot = bool(model.predict(features)[0])
-        bot_probability = float(model.predict_proba(features)[0][1])
-
-        # Calculate confidence metrics
-        confidence_metrics = {
-            "mouse_movement_score": min(1.0, data.mouse_movement / 10.0),
-            "typing_pattern_score": min(1.0, max(0, 1 - (data.typing_speed / 1000.0))),
-            "click_pattern_score": data.click_pattern,
-            "time_spent_score": min(1.0, data.time_spent / 30.0)
-        }
+        state.model = joblib.load(state.model_path)
+        state.encoder = joblib.load(state.encoder_path)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        state.model = None
+        state.encoder = None
+        state.load_error = str(e)
+    state.timings["load_sec"] = time.perf_counter() - start
 
-        # Identify risk factors
-        risk_factors = []
-        if data.mouse_movement < 2.0:
-            risk_factors.append("Unusually low mouse movement")
-        if data.typing_speed > 800:
-            risk_factors.append("Suspiciously fast typing speed")
-        if data.click_pattern < 0.3:
-            risk_factors.append("Regular click pattern detected")
-        if data.time_spent < 5:
-            risk_factors.append("Very short page interaction time")
-        if data.captcha_success == 0:
-            risk_factors.append("Failed CAPTCHA")
-        if data.form_fill_time < 3.0:
-            risk_factors.append("Suspiciously quick form filling")
-
-        return PredictionResponse(
-            is_bot=is_bot,
-            probability=bot_probability,
-            confidence_metrics=confidence_metrics,
-            risk_factors=risk_factors
-        )
+    if state.model is not None:
+        start = time.perf_counter()
+        try:
+            warm_up(state.model, state.encoder, state.warmup_rounds)
+        except Exception as e:
+            print(f"Error warming up model: {e}")
+        state.timings["warmup_sec"] = time.perf_counter() - start
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    state.timings["ready_after_sec"] = time.perf_counter() - _IMPORT_START
+    state.ready = state.model is not None
+    print(f"[startup] cold_start={state.timings['cold_start_sec']:.3f}s "
+          f"load={state.timings['load_sec']:.3f}s "
+          f"warmup={state.timings.get('warmup_sec', 0.0):.3f}s "
+          f"ready={state.ready}")
+
+def warm_up(model, encoder, rounds):
+    """Run single-row predictions the same way the endpoints do"""
+    for i in range(rounds):
+        row = list(WARMUP_SESSIONS[i % len(WARMUP_SESSIONS)])
+        if encoder is not None and row[4] in encoder.classes_:
+            row[4] = encoder.transform([row[4]])[0]
+        else:
+            row[4] = 0
+        features = np.array([row], dtype=float)
+        model.predict(features)
+        model.predict_proba(features)
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start loading the model in the background as soon as the server starts"""
+    threading.Thread(target=load_artifacts, args=(app.state,), daemon=True).start()
+    yield
 
-@app.post("/predict_session", response_model=SessionPredictionResponse)
-async def predict_session(data: SessionData):
-    print("[predict_session] Received data from frontend:", data.model_dump())
+def create_app():
     """
-    Predict whether a session is from a bot or human
+    Build the FastAPI app. Model loading and warm-up run in a background
+    thread so the server starts accepting connections immediately and
+    reports readiness on /ready once warm-up is done.
     """
-    if model is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
+    create_start = time.perf_counter()
+    from dotenv import load_dotenv
 
-    try:
-        # Prepare features in the correct order
-        features = np.array([[
-            data.mouse_movement_units,
-            data.typing_speed_cpm,
-            data.click_pattern_score,
-            data.time_spent_on_page_sec,
-            data.scroll_behavior_encoded,
-            data.captcha_success,
-            data.form_fill_time_sec
-        ]])
-
-        # Get prediction and probability
-        is_bot = bool(model.predict(features)[0])
-        bot_probability = float(model.predict_proba(features)[0][1])
-
-        # Calculate confidence metrics based on the features
-        confidence_metrics = {
-            "mouse_movement_score": min(1.0, data.mouse_movement_units / 10.0),
-            "typing_pattern_score": min(1.0, max(0, 1 - (data.typing_speed_cpm / 1000.0))),
-            "click_pattern_score": data.click_pattern_score,
-            "time_spent_score": min(1.0, data.time_spent_on_page_sec / 30.0)
+    # Load environment variables from .env if present
+    load_dotenv()
+
+    # Initialize FastAPI app
+    app = FastAPI(
+        title="Grinch Bot Detector API",
+        description="API for detecting bot behavior on e-commerce websites",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Add CORS middleware to allow requests from Chrome extension
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow requests from any origin (important for local testing)
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.exception_handler(RequestValidationError)
+    async def validation_error(request, exc):
+        # The default handler echoes the rejected input, which can't be
+        # rendered as JSON when it is NaN or infinite, so leave it out
+        errors = [{"loc": e["loc"], "msg": e["msg"], "type": e["type"]} for e in exc.errors()]
+        return JSONResponse(status_code=422, content={"detail": errors})
+
+    # Opt-in request profiling: a fraction of requests and/or every request
+    # slower than PROFILE_SLOW_MS, exported from /admin/profile
+    profile_sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    profile_slow_ms = os.getenv("PROFILE_SLOW_MS")
+    app.state.profiler = None
+    if profile_sample_rate > 0 or profile_slow_ms:
+        from profiling import StackSampler, ProfilingMiddleware
+        app.state.profiler = StackSampler(interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")))
+        app.add_middleware(
+            ProfilingMiddleware,
+            sampler=app.state.profiler,
+            sample_rate=profile_sample_rate,
+            slow_ms=float(profile_slow_ms) if profile_slow_ms else None,
+        )
+
+    # Model and encoder paths come from environment variables
+    state = app.state
+    state.model_path = os.getenv("MODEL_PATH", "rf_bot_model.pkl")
+    state.encoder_path = os.getenv("ENCODER_PATH", "scroll_behavior_encoder.pkl")
+    state.warmup_rounds = int(os.getenv("WARMUP_ROUNDS", "20"))
+    state.model = None
+    state.encoder = None
+    state.tz = None
+    state.load_error = None
+    state.ready = False
+    state.timings = {"module_import_sec": MODULE_IMPORT_SEC}
+    state.admin_token = os.getenv("ADMIN_TOKEN")
+
+    # Latest session data for Streamlit
+    state.latest_session = None
+
+    # Per-session feature accumulators fed by /events
+    from session_features import SessionStore
+    state.sessions = SessionStore(
+        max_sessions=int(os.getenv("SESSION_STORE_MAX", "100000")),
+        ttl_sec=float(os.getenv("SESSION_TTL_SEC", "1800")),
+    )
+
+    # Fixed-memory counts of repeated feature fingerprints across sessions
+    from swarm import SwarmDetector, fingerprint
+    state.swarm = SwarmDetector(
+        window_sec=float(os.getenv("SWARM_WINDOW_SEC", "300")),
+        buckets=int(os.getenv("SWARM_BUCKETS", "10")),
+        width=int(os.getenv("SWARM_SKETCH_WIDTH", "2048")),
+        depth=int(os.getenv("SWARM_SKETCH_DEPTH", "4")),
+        top_k=int(os.getenv("SWARM_TOP_K", "50")),
+        threshold=int(os.getenv("SWARM_THRESHOLD", "20")),
+    )
+
+    @app.get("/")
+    async def root():
+        """Health check endpoint"""
+        return {"status": "online", "model_loaded": state.model is not None}
+
+    @app.get("/ready")
+    async def ready():
+        """Readiness endpoint: 200 once the model is loaded and warmed up, 503 before"""
+        body = {
+            "ready": state.ready,
+            "model_loaded": state.model is not None,
+            "timings": state.timings,
         }
+        if state.load_error:
+            body["error"] = state.load_error
+        return JSONResponse(status_code=200 if state.ready else 503, content=body)
 
-        # Identify risk factors
-        risk_factors = []
-        if data.mouse_movement_units < 2.0:
-            risk_factors.append("Unusually low mouse movement")
-        if data.typing_speed_cpm > 800:
-            risk_factors.append("Suspiciously fast typing speed")
-        if data.click_pattern_score < 0.3:
-            risk_factors.append("Regular click pattern detected")
-        if data.time_spent_on_page_sec < 5:
-            risk_factors.append("Very short page interaction time")
-        if data.captcha_success == 0:
-            risk_factors.append("Failed CAPTCHA")
-        if data.form_fill_time_sec < 3.0:
-            risk_factors.append("Suspiciously quick form filling")
-
-        # Generate a unique session ID based on timestamp
-        import time
-        from datetime import datetime
-        import pytz
-        tz = pytz.timezone('Asia/Kolkata')
-        now = datetime.now(tz)
-        session_id = f"session_{int(time.time())}"
-        # Store the session data and results for Streamlit
-        global latest_session
-        latest_session = {
-            "session_id": session_id,
-            "timestamp": now.isoformat(),
-            "features": {
-                "mouse_movement_units": data.mouse_movement_units,
-                "typing_speed_cpm": data.typing_speed_cpm,
-                "click_pattern_score": data.click_pattern_score,
-                "time_spent_on_page_sec": data.time_spent_on_page_sec,
-                "scroll_behavior_encoded": data.scroll_behavior_encoded,
-                "captcha_success": data.captcha_success,
-                "form_fill_time_sec": data.form_fill_time_sec
-            },
-            "prediction": {
-                "is_bot": is_bot,
-                "probability": bot_probability,
-                "confidence_metrics": confidence_metrics,
-                "risk_factors": risk_factors
+    @app.post("/predict", response_model=PredictionResponse)
+    async def predict_bot(data: BehaviorData):
+        """
+        Predict whether the behavior is from a bot or human
+        """
+        model = state.model
+        encoder = state.encoder
+        if model is None or encoder is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+
+        try:
+            # Encode scroll behavior
+            scroll_encoded = encoder.transform([data.scroll_behavior])[0]
+
+            # Prepare features in the correct order
+            features = np.array([[
+                data.mouse_movement,
+                data.typing_speed,
+                data.click_pattern,
+                data.time_spent,
+                scroll_encoded,
+                data.captcha_success,
+                data.form_fill_time
+            ]])
+
+            # Get prediction and probability
+            is_bot = bool(model.predict(features)[0])
+            bot_probability = float(model.predict_proba(features)[0][1])
+
+            # Calculate confidence metrics
+            confidence_metrics = {
+                "mouse_movement_score": min(1.0, data.mouse_movement / 10.0),
+                "typing_pattern_score": min(1.0, max(0, 1 - (data.typing_speed / 1000.0))),
+                "click_pattern_score": data.click_pattern,
+                "time_spent_score": min(1.0, data.time_spent / 30.0)
             }
-        }
-        
-        # Save the session data to a file for persistence
+
+            # Identify risk factors
+            risk_factors = []
+            if data.mouse_movement < 2.0:
+                risk_factors.append("Unusually low mouse movement")
+            if data.typing_speed > 800:
+                risk_factors.append("Suspiciously fast typing speed")
+            if data.click_pattern < 0.3:
+                risk_factors.append("Regular click pattern detected")
+            if data.time_spent < 5:
+                risk_factors.append("Very short page interaction time")
+            if data.captcha_success == 0:
+                risk_factors.append("Failed CAPTCHA")
+            if data.form_fill_time < 3.0:
+                risk_factors.append("Suspiciously quick form filling")
+
+            return PredictionResponse(
+                is_bot=is_bot,
+                probability=bot_probability,
+                confidence_metrics=confidence_metrics,
+                risk_factors=risk_factors
+            )
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+    def score_session(data: SessionData, acc=None):
+        """
+        Score one session's features, shared by both /predict_session routes.
+        `acc` is the accumulator of a keyed session, used to count it in the
+        swarm detector only once per fingerprint.
+        """
+        model = state.model
+        if model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+
         try:
-            with open("latest_session.json", "w") as f:
-                json.dump(latest_session, f)
+            # Prepare features in the correct order
+            features = np.array([[
+                data.mouse_movement_units,
+                data.typing_speed_cpm,
+                data.click_pattern_score,
+                data.time_spent_on_page_sec,
+                data.scroll_behavior_encoded,
+                data.captcha_success,
+                data.form_fill_time_sec
+            ]])
+
+            # Get prediction and probability
+            is_bot = bool(model.predict(features)[0])
+            bot_probability = float(model.predict_proba(features)[0][1])
+
+            # Calculate confidence metrics based on the features
+            confidence_metrics = {
+                "mouse_movement_score": min(1.0, data.mouse_movement_units / 10.0),
+                "typing_pattern_score": min(1.0, max(0, 1 - (data.typing_speed_cpm / 1000.0))),
+                "click_pattern_score": data.click_pattern_score,
+                "time_spent_score": min(1.0, data.time_spent_on_page_sec / 30.0)
+            }
+
+            # Identify risk factors
+            risk_factors = []
+            if data.mouse_movement_units < 2.0:
+                risk_factors.append("Unusually low mouse movement")
+            if data.typing_speed_cpm > 800:
+                risk_factors.append("Suspiciously fast typing speed")
+            if data.click_pattern_score < 0.3:
+                risk_factors.append("Regular click pattern detected")
+            if data.time_spent_on_page_sec < 5:
+                risk_factors.append("Very short page interaction time")
+            if data.captcha_success == 0:
+                risk_factors.append("Failed CAPTCHA")
+            if data.form_fill_time_sec < 3.0:
+                risk_factors.append("Suspiciously quick form filling")
+
+            # Count how often this quantized feature vector was seen across sessions.
+            # Re-scoring a keyed session with an unchanged fingerprint only reads the
+            # count, so one session can't push its own fingerprint over the threshold
+            fp = fingerprint(features[0]) if np.isfinite(features).all() else None
+            if acc is not None and fp is not None and fp == acc.swarm_fp:
+                fingerprint_frequency = state.swarm.estimate(fp)
+            else:
+                fingerprint_frequency = state.swarm.add(features[0])
+                if acc is not None:
+                    acc.swarm_fp = fp
+            if state.swarm.is_coordinated(fingerprint_frequency):
+                risk_factors.append("Coordinated pattern across sessions")
+
+            # Generate a unique session ID based on timestamp
+            now = datetime.now(state.tz)
+            session_id = f"session_{int(time.time())}"
+            # Store the session data and results for Streamlit
+            state.latest_session = {
+                "session_id": session_id,
+                "timestamp": now.isoformat(),
+                "features": {
+                    "mouse_movement_units": data.mouse_movement_units,
+                    "typing_speed_cpm": data.typing_speed_cpm,
+                    "click_pattern_score": data.click_pattern_score,
+                    "time_spent_on_page_sec": data.time_spent_on_page_sec,
+                    "scroll_behavior_encoded": data.scroll_behavior_encoded,
+                    "captcha_success": data.captcha_success,
+                    "form_fill_time_sec": data.form_fill_time_sec
+                },
+                "prediction": {
+                    "is_bot": is_bot,
+                    "probability": bot_probability,
+                    "confidence_metrics": confidence_metrics,
+                    "risk_factors": risk_factors,
+                    "fingerprint_frequency": fingerprint_frequency
+                }
+            }
+
+            # Save the session data to a file for persistence
+            try:
+                with open("latest_session.json", "w") as f:
+                    json.dump(state.latest_session, f)
+            except Exception as e:
+                print(f"Error saving session data: {e}")
+
+            return SessionPredictionResponse(
+                is_bot=is_bot,
+                probability=bot_probability,
+                confidence_metrics=confidence_metrics,
+                risk_factors=risk_factors,
+                session_id=session_id,
+                fingerprint_frequency=fingerprint_frequency
+            )
+
         except Exception as e:
-            print(f"Error saving session data: {e}")
-
-        return SessionPredictionResponse(
-            is_bot=is_bot,
-            probability=bot_probability,
-            confidence_metrics=confidence_metrics,
-            risk_factors=risk_factors,
-            session_id=session_id
+            raise HTTPException(status_code=500, detail=f"Session prediction error: {str(e)}")
+
+    @app.post("/predict_session", response_model=SessionPredictionResponse)
+    async def predict_session(data: SessionData):
+        print("[predict_session] Received data from frontend:", data.model_dump())
+        """
+        Predict whether a session is from a bot or human
+        """
+        return score_session(data)
+
+    @app.post("/events", response_model=EventIngestResponse)
+    async def ingest_events(batch: EventBatch):
+        """
+        Fold a batch of raw interaction events into the session's running features
+        """
+        acc, accepted = state.sessions.add_events(batch.session_key, batch.events)
+        return EventIngestResponse(
+            session_key=batch.session_key,
+            events_accepted=accepted,
+            total_events=acc.events
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Session prediction error: {str(e)}")
+    @app.post("/predict_session/{session_key}", response_model=SessionPredictionResponse)
+    async def predict_session_by_key(session_key: str, captcha_success: Optional[int] = None):
+        """
+        Predict whether a session is from a bot or human using the features
+        accumulated from its events. `captcha_success` overrides the value
+        from the events, for sites that verify the CAPTCHA server-side. One of
+        the two is required, since a missing CAPTCHA result is not a failure.
+        """
+        acc = state.sessions.get(session_key)
+        if acc is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session")
+        encoder = state.encoder
+        if encoder is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
 
-@app.get("/latest_session")
-async def get_latest_session():
-    """Get the latest session data for Streamlit app"""
-    if latest_session is None:
-        try:
-            with open("latest_session.json", "r") as f:
-                return json.load(f)
-        except Exception:
-            return {"error": "No session data available"}
-    return latest_session
-
-@app.get("/model-info")
-async def model_info():
-    """Get information about the loaded model"""
-    if model is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
-    
-    return {
-        "model_type": type(model).__name__,
-        "features": [
-            "mouse_movement_units",
-            "typing_speed_cpm",
-            "click_pattern_score",
-            "time_spent_on_page_sec",
-            "scroll_behavior_encoded",
-            "captcha_success",
-            "form_fill_time_sec"
-        ],
-        "scroll_behaviors": list(encoder.classes_) if encoder else None
-    }
+        features = acc.features()
+        # Encode the scroll behavior label, treating labels the model doesn't know as the first class
+        scroll_behavior = features[4]
+        features[4] = int(encoder.transform([scroll_behavior])[0]) if scroll_behavior in encoder.classes_ else 0
+        if captcha_success is not None:
+            features[5] = captcha_success
+        if features[5] is None:
+            raise HTTPException(
+                status_code=422,
+                detail="No CAPTCHA result for this session: send a captcha event or pass ?captcha_success="
+            )
+        return score_session(SessionData(
+            mouse_movement_units=features[0],
+            typing_speed_cpm=features[1],
+            click_pattern_score=features[2],
+            time_spent_on_page_sec=features[3],
+            scroll_behavior_encoded=features[4],
+            captcha_success=features[5],
+            form_fill_time_sec=features[6]
+        ), acc)
+
+    @app.get("/latest_session")
+    async def get_latest_session():
+        """Get the latest session data for Streamlit app"""
+        if state.latest_session is None:
+            try:
+                with open("latest_session.json", "r") as f:
+                    return json.load(f)
+            except Exception:
+                return {"error": "No session data available"}
+        return state.latest_session
+
+    @app.get("/model-info")
+    async def model_info():
+        """Get information about the loaded model"""
+        model = state.model
+        encoder = state.encoder
+        if model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+
+        return {
+            "model_type": type(model).__name__,
+            "features": [
+                "mouse_movement_units",
+                "typing_speed_cpm",
+                "click_pattern_score",
+                "time_spent_on_page_sec",
+                "scroll_behavior_encoded",
+                "captcha_success",
+                "form_fill_time_sec"
+            ],
+            "scroll_behaviors": list(encoder.classes_) if encoder else None
+        }
+
+    def check_admin(token):
+        # Admin endpoints stay closed unless a token is configured
+        if not state.admin_token:
+            raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN")
+        if token is None or not hmac.compare_digest(token.encode(), state.admin_token.encode()):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    @app.get("/swarm/top")
+    async def swarm_top(limit: int = 20, x_admin_token: Optional[str] = Header(None)):
+        """Most frequent session fingerprints in the current swarm window"""
+        check_admin(x_admin_token)
+        return {
+            "window_sec": state.swarm.window_sec,
+            "threshold": state.swarm.threshold,
+            "fingerprints": state.swarm.top(limit),
+        }
+
+    def check_profiler(token):
+        check_admin(token)
+        if state.profiler is None:
+            raise HTTPException(status_code=404, detail="Profiling is not enabled")
+
+    @app.get("/admin/profile")
+    async def get_profile(format: str = "collapsed", x_admin_token: Optional[str] = Header(None)):
+        """
+        Export aggregated request profiles as collapsed stacks (for flamegraph.pl),
+        a speedscope profile, or summary stats
+        """
+        check_profiler(x_admin_token)
+        if format == "collapsed":
+            return PlainTextResponse(state.profiler.export_collapsed())
+        if format == "speedscope":
+            return state.profiler.export_speedscope()
+        if format == "stats":
+            return state.profiler.stats()
+        raise HTTPException(status_code=400, detail="format must be collapsed, speedscope or stats")
+
+    @app.delete("/admin/profile")
+    async def reset_profile(x_admin_token: Optional[str] = Header(None)):
+        """Clear the aggregated profiles"""
+        check_profiler(x_admin_token)
+        state.profiler.reset()
+        return {"status": "reset"}
+
+    # Time spent building the app, and everything since the module started importing
+    state.timings["create_app_sec"] = time.perf_counter() - create_start
+    state.timings["cold_start_sec"] = time.perf_counter() - _IMPORT_START
+    return app
+
+# Module-level app so `uvicorn app:app` keeps working
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
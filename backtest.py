@@ -0,0 +1,234 @@
+"""
+Historical backtesting of candidate models.
+
+Re-scores a session log with several model/encoder pairs in parallel and
+writes a report of how their verdicts differ from the first (baseline) model:
+flip rates, probability shifts, disagreements per risk factor and scoring
+throughput per model.
+
+The session log can be a CSV in the training schema (with `scroll_behavior`
+labels or `scroll_behavior_encoded`) or a JSON-lines file of session records
+as stored by the API (`{"features": {...}, ...}` per line).
+
+Usage:
+    python backtest.py --log sessions.csv \
+        --model rf_bot_model.pkl:scroll_behavior_encoder.pkl \
+        --model bot_model_large.pkl:scroll_behavior_encoder_large.pkl
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Same feature order as the API
+FEATURES = ['mouse_movement_units', 'typing_speed_cpm', 'click_pattern_score',
+            'time_spent_on_page_sec', 'scroll_behavior_encoded', 'captcha_success',
+            'form_fill_time_sec']
+
+# Vectorized versions of the API's risk factor rules
+RISK_FACTORS = {
+    "Unusually low mouse movement": lambda X: X[:, 0] < 2.0,
+    "Suspiciously fast typing speed": lambda X: X[:, 1] > 800,
+    "Regular click pattern detected": lambda X: X[:, 2] < 0.3,
+    "Very short page interaction time": lambda X: X[:, 3] < 5,
+    "Failed CAPTCHA": lambda X: X[:, 5] == 0,
+    "Suspiciously quick form filling": lambda X: X[:, 6] < 3.0,
+}
+
+BATCH_SIZE = 100_000
+
+def load_session_log(path):
+    """
+    Read a session log into a float32 feature matrix.
+    Returns (X, scroll_labels, scroll_codes): when the log holds raw scroll
+    behavior labels, column 4 of X is left empty and each model fills it in
+    with its own encoder from `scroll_labels` / `scroll_codes`.
+    """
+    if path.endswith((".jsonl", ".json")):
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        df = pd.DataFrame([r.get("features", r) for r in records])
+    else:
+        df = pd.read_csv(path)
+    if df.empty:
+        raise ValueError(f"No sessions found in {path}")
+
+    scroll_labels, scroll_codes = None, None
+    if 'scroll_behavior_encoded' not in df.columns:
+        scroll = df['scroll_behavior'].astype('category')
+        scroll_labels = list(scroll.cat.categories)
+        scroll_codes = scroll.cat.codes.to_numpy().astype(np.int16)
+        df['scroll_behavior_encoded'] = 0
+
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    return X, scroll_labels, scroll_codes
+
+# Read-only input shared by the worker processes (memory-mapped, not copied)
+_shared = {}
+
+def _init_worker(features_path, scroll_labels, scroll_codes_path):
+    _shared["X"] = np.load(features_path, mmap_mode="r")
+    _shared["scroll_labels"] = scroll_labels
+    _shared["scroll_codes"] = np.load(scroll_codes_path, mmap_mode="r") if scroll_codes_path else None
+
+def score_model(model_path, encoder_path):
+    """Score the shared session log with one model. Runs in a worker process."""
+    model = joblib.load(model_path)
+    encoder = joblib.load(encoder_path)
+    # Parallelism comes from the process pool, avoid oversubscribing cores
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+
+    X = _shared["X"]
+    lookup = None
+    if _shared["scroll_labels"] is not None:
+        # Labels unknown to this encoder are scored as the first class. The last
+        # entry is the same fallback for missing labels (category code -1).
+        known = set(encoder.classes_)
+        lookup = np.array([encoder.transform([label])[0] if label in known else 0
+                           for label in _shared["scroll_labels"]] + [0], dtype=np.float32)
+
+    probability = np.empty(len(X), dtype=np.float32)
+    is_bot = np.empty(len(X), dtype=bool)
+    start = time.perf_counter()
+    for lo in range(0, len(X), BATCH_SIZE):
+        batch = np.array(X[lo:lo + BATCH_SIZE])
+        if lookup is not None:
+            codes = _shared["scroll_codes"][lo:lo + BATCH_SIZE]
+            batch[:, 4] = lookup[np.where(codes < 0, len(lookup) - 1, codes)]
+        proba = model.predict_proba(batch)
+        probability[lo:lo + BATCH_SIZE] = proba[:, 1]
+        is_bot[lo:lo + BATCH_SIZE] = model.classes_[proba.argmax(axis=1)].astype(bool)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "model_path": model_path,
+        "model_type": type(model).__name__,
+        "probability": probability,
+        "is_bot": is_bot,
+        "score_sec": elapsed,
+        "rows_per_sec": len(X) / max(elapsed, 1e-9),
+    }
+
+def compare(baseline, candidate, risk_masks):
+    """Summarize how a candidate's verdicts differ from the baseline's"""
+    flipped = baseline["is_bot"] != candidate["is_bot"]
+    shift = candidate["probability"] - baseline["probability"]
+    abs_shift = np.abs(shift)
+
+    per_risk_factor = {}
+    for factor, mask in risk_masks.items():
+        count = int(mask.sum())
+        per_risk_factor[factor] = {
+            "sessions": count,
+            "flips": int(flipped[mask].sum()),
+            "flip_rate": float(flipped[mask].mean()) if count else 0.0,
+        }
+
+    return {
+        "flip_rate": float(flipped.mean()),
+        "flips": int(flipped.sum()),
+        "human_to_bot": int((flipped & candidate["is_bot"]).sum()),
+        "bot_to_human": int((flipped & baseline["is_bot"]).sum()),
+        "probability_shift": {
+            "mean": float(shift.mean()),
+            "mean_abs": float(abs_shift.mean()),
+            "p95_abs": float(np.percentile(abs_shift, 95)),
+            "max_abs": float(abs_shift.max()),
+        },
+        "per_risk_factor": per_risk_factor,
+    }
+
+def run_backtest(log_path, models, workers=None):
+    """Score `log_path` with every (model_path, encoder_path) pair and build the report"""
+    X, scroll_labels, scroll_codes = load_session_log(log_path)
+    print(f"Loaded {len(X):,} sessions from {log_path}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        features_path = os.path.join(tmp, "features.npy")
+        np.save(features_path, X)
+        scroll_codes_path = None
+        if scroll_codes is not None:
+            scroll_codes_path = os.path.join(tmp, "scroll_codes.npy")
+            np.save(scroll_codes_path, scroll_codes)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers or min(len(models), os.cpu_count() or 1),
+                                 initializer=_init_worker,
+                                 initargs=(features_path, scroll_labels, scroll_codes_path)) as pool:
+            futures = [pool.submit(score_model, m, e) for m, e in models]
+            results = [f.result() for f in futures]
+        wall_sec = time.perf_counter() - start
+
+    risk_masks = {factor: rule(X) for factor, rule in RISK_FACTORS.items()}
+    risk_masks["No risk factors"] = ~np.any(list(risk_masks.values()), axis=0)
+
+    baseline = results[0]
+    report = {
+        "session_log": log_path,
+        "sessions": len(X),
+        "wall_sec": wall_sec,
+        "baseline": baseline["model_path"],
+        "models": [],
+    }
+    for result in results:
+        entry = {
+            "model_path": result["model_path"],
+            "model_type": result["model_type"],
+            "bot_rate": float(result["is_bot"].mean()),
+            "mean_probability": float(result["probability"].mean()),
+            "score_sec": result["score_sec"],
+            "rows_per_sec": result["rows_per_sec"],
+        }
+        if result is not baseline:
+            entry["vs_baseline"] = compare(baseline, result, risk_masks)
+        report["models"].append(entry)
+    return report
+
+def print_report(report):
+    print(f"\nBacktest Report ({report['sessions']:,} sessions, baseline: {report['baseline']})")
+    print("------------------------")
+    for entry in report["models"]:
+        print(f"{entry['model_path']} [{entry['model_type']}]")
+        print(f"  bot rate: {entry['bot_rate']:.2%}  throughput: {entry['rows_per_sec']:,.0f} rows/s")
+        diff = entry.get("vs_baseline")
+        if diff:
+            shift = diff["probability_shift"]
+            print(f"  flip rate: {diff['flip_rate']:.2%} "
+                  f"(human->bot {diff['human_to_bot']:,}, bot->human {diff['bot_to_human']:,})")
+            print(f"  probability shift: mean {shift['mean']:+.4f}, "
+                  f"mean abs {shift['mean_abs']:.4f}, p95 abs {shift['p95_abs']:.4f}")
+            for factor, stats in diff["per_risk_factor"].items():
+                print(f"    {factor}: {stats['flips']:,}/{stats['sessions']:,} flipped "
+                      f"({stats['flip_rate']:.2%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score a session log with several candidate models")
+    parser.add_argument("--log", required=True, help="Session log (CSV or JSON lines)")
+    parser.add_argument("--model", action="append", required=True,
+                        help="model_path:encoder_path, repeat for each model. The first is the baseline.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per model)")
+    parser.add_argument("--out", default="backtest_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    models = []
+    for spec in args.model:
+        model_path, sep, encoder_path = spec.partition(":")
+        if not sep:
+            parser.error(f"--model must be model_path:encoder_path, got {spec!r}")
+        models.append((model_path, encoder_path))
+
+    try:
+        report = run_backtest(args.log, models, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print_report(report)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Report saved to {args.out}")
@@ -0,0 +1,195 @@
+"""
+Sampled request profiling for the API.
+
+A background thread takes stack samples of the event loop thread while a
+profiled request is in flight. Requests are profiled when picked by the
+sample rate, or kept after the fact when they turn out slower than the
+latency threshold. Kept samples are aggregated into collapsed stacks, which
+can be exported as flamegraph input or as a speedscope profile.
+
+Under concurrency, samples show what the event loop was doing while the
+request was in flight, which may include work for other requests. Each tick
+is recorded once in a shared ring, so overlapping kept requests never count
+the same sample twice.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+class StackSampler:
+    """Samples the stacks of threads serving profiled requests and aggregates them"""
+
+    def __init__(self, interval_ms=5.0, max_stacks=5000, max_samples_per_request=2000,
+                 ring_size=20000):
+        self.interval = interval_ms / 1000.0
+        self.max_stacks = max_stacks
+        self.max_samples_per_request = max_samples_per_request
+        self.stacks = Counter()
+        self.profiled_requests = 0
+        self.total_samples = 0
+        # Active requests: id(token) -> (thread_id, tick at begin)
+        self._tokens = {}
+        # Recent (tick, thread_id, stack) samples, one per thread per tick
+        self._ring = deque(maxlen=ring_size)
+        self._tick = 0
+        # thread_id -> last tick already merged into `stacks`
+        self._merged_tick = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self):
+        """Start collecting samples for a request served on the current thread"""
+        with self._lock:
+            token = (threading.get_ident(), self._tick)
+            self._tokens[id(token)] = token
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return token
+
+    def end(self, token, keep):
+        """Stop collecting for a request, merging its samples if `keep` is true"""
+        with self._lock:
+            self._tokens.pop(id(token), None)
+            if not self._tokens:
+                self._wake.clear()
+            if not keep:
+                return
+            self.profiled_requests += 1
+            thread_id, start_tick = token
+            # Skip ticks an overlapping kept request on this thread already merged
+            since = max(start_tick, self._merged_tick.get(thread_id, 0))
+            self._merged_tick[thread_id] = self._tick
+            samples = [stack for tick, tid, stack in self._ring
+                       if tid == thread_id and tick > since]
+            for stack in samples[:self.max_samples_per_request]:
+                self.total_samples += 1
+                if stack in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[stack] += 1
+                else:
+                    self.stacks["[other]"] += 1
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.profiled_requests = 0
+            self.total_samples = 0
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = {thread_id for thread_id, _ in self._tokens.values()}
+            collapsed = {thread_id: self._collapse(frames[thread_id])
+                         for thread_id in thread_ids if thread_id in frames}
+            del frames
+            with self._lock:
+                self._tick += 1
+                for thread_id, stack in collapsed.items():
+                    self._ring.append((self._tick, thread_id, stack))
+
+    def export_collapsed(self):
+        """Collapsed stacks (`frame;frame;frame count` per line), as used by flamegraph.pl"""
+        with self._lock:
+            items = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def export_speedscope(self, name="Grinch Bot Detector API"):
+        """Aggregated samples in speedscope's sampled profile format"""
+        with self._lock:
+            items = self.stacks.most_common()
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        interval_ms = self.interval * 1000.0
+        for stack, count in items:
+            sample = []
+            for label in stack.split(";"):
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({"name": label})
+                sample.append(frame_index[label])
+            samples.append(sample)
+            weights.append(count * interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "grinch-bot-detector",
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "profiled_requests": self.profiled_requests,
+                "samples": self.total_samples,
+                "distinct_stacks": len(self.stacks),
+                "interval_ms": self.interval * 1000.0,
+            }
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a fraction of requests, plus every request
+    slower than `slow_ms`. Only paths starting with one of `prefixes` are
+    profiled (by default every scoring route, including
+    /predict_session/{session_key}); other requests pass straight through.
+    """
+
+    def __init__(self, app, sampler, sample_rate=0.0, slow_ms=None,
+                 prefixes=("/predict",)):
+        self.app = app
+        self.sampler = sampler
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.slow_ms is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = self.sampler.begin()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            keep = sampled or (self.slow_ms is not None and elapsed_ms >= self.slow_ms)
+            self.sampler.end(token, keep)
@@ -0,0 +1,202 @@
+"""
+Server-side feature extraction from raw interaction events.
+
+The frontend posts batches of raw mouse, key, scroll and click events while
+the user browses. Each batch is folded into a per-session accumulator of
+running sums, so at checkout the 7 model features are read off in constant
+time instead of being computed (and trusted) on the client.
+
+Events are folded in time order: each batch is sorted by timestamp, and
+events older than the latest one already folded for the session (e.g. from a
+batch that arrived late) are dropped rather than rewriting past gaps.
+
+Accumulators have a fixed size, and the store holds at most `max_sessions`
+of them, evicting the least recently updated and expiring idle sessions.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# Pixels of mouse travel per "mouse movement unit"
+MOUSE_UNIT_PX = 100.0
+# Gaps between keystrokes longer than this are pauses, not typing time
+MAX_KEY_GAP_SEC = 2.0
+# Every keystroke counts for at least this long, so keys sent with identical
+# timestamps read as very fast typing rather than no typing at all
+MIN_KEY_GAP_SEC = 0.005
+# Total scroll distance (px) thresholds for the scroll behavior labels
+SCROLL_SHORT_PX = 1000.0
+SCROLL_LONG_PX = 5000.0
+# Click pattern score used until there are enough clicks to measure
+DEFAULT_CLICK_PATTERN = 0.5
+
+class SessionAccumulator:
+    """Running per-session sums that the 7 features are derived from"""
+
+    __slots__ = ("first_t", "last_t", "events",
+                 "last_x", "last_y", "mouse_px",
+                 "keys", "first_key_t", "last_key_t", "typing_sec",
+                 "scroll_px",
+                 "last_click_t", "click_gaps", "click_gap_mean", "click_gap_m2",
+                 "captcha_success", "submit_t",
+                 "swarm_fp")
+
+    def __init__(self):
+        self.first_t = None
+        self.last_t = None
+        self.events = 0
+        self.last_x = None
+        self.last_y = None
+        self.mouse_px = 0.0
+        self.keys = 0
+        self.first_key_t = None
+        self.last_key_t = None
+        self.typing_sec = 0.0
+        self.scroll_px = 0.0
+        self.last_click_t = None
+        self.click_gaps = 0
+        self.click_gap_mean = 0.0
+        self.click_gap_m2 = 0.0
+        self.captcha_success = None
+        self.submit_t = None
+        # Fingerprint this session was last counted under by the swarm detector
+        self.swarm_fp = None
+
+    def add(self, event):
+        """
+        Fold one event into the running sums. `event` has a `type`
+        ("move", "key", "scroll", "click", "captcha" or "submit"), a client
+        timestamp `t` in milliseconds, and `x`/`y`, `dy` or `success` as relevant.
+        Returns False (and ignores the event) if it is older than the last one.
+        """
+        t = event.t / 1000.0
+        if self.last_t is not None and t < self.last_t:
+            return False
+        if self.first_t is None:
+            self.first_t = t
+        self.last_t = t
+        self.events += 1
+
+        kind = event.type
+        if kind in ("move", "click") and event.x is not None and event.y is not None:
+            if self.last_x is not None:
+                self.mouse_px += math.hypot(event.x - self.last_x, event.y - self.last_y)
+            self.last_x, self.last_y = event.x, event.y
+
+        if kind == "key":
+            if self.last_key_t is not None:
+                self.typing_sec += min(max(t - self.last_key_t, MIN_KEY_GAP_SEC), MAX_KEY_GAP_SEC)
+            if self.first_key_t is None:
+                self.first_key_t = t
+            self.last_key_t = t
+            self.keys += 1
+        elif kind == "scroll":
+            self.scroll_px += abs(event.dy or 0.0)
+        elif kind == "click":
+            if self.last_click_t is not None:
+                # Welford's running mean and variance of inter-click gaps
+                gap = t - self.last_click_t
+                self.click_gaps += 1
+                delta = gap - self.click_gap_mean
+                self.click_gap_mean += delta / self.click_gaps
+                self.click_gap_m2 += delta * (gap - self.click_gap_mean)
+            self.last_click_t = t
+        elif kind == "captcha":
+            self.captcha_success = int(bool(event.success))
+        elif kind == "submit":
+            self.submit_t = t
+        return True
+
+    def features(self):
+        """
+        Current feature values in SessionData order, except that scroll
+        behavior is returned as a label ("long", "medium", "none" or "short")
+        to be encoded with the model's encoder, and CAPTCHA success is None
+        when no captcha event was received.
+        """
+        time_spent = (self.last_t - self.first_t) if self.events else 0.0
+
+        # Characters per minute of active typing (long pauses excluded). Typing
+        # time covers the gaps between keys, so the rate is gaps per minute
+        typing_speed = (self.keys - 1) / (self.typing_sec / 60.0) if self.typing_sec > 0 else 0.0
+
+        # Irregularity of click timing: coefficient of variation, capped at 1
+        if self.click_gaps >= 2 and self.click_gap_mean > 0:
+            std = math.sqrt(self.click_gap_m2 / (self.click_gaps - 1))
+            click_pattern = min(1.0, std / self.click_gap_mean)
+        else:
+            click_pattern = DEFAULT_CLICK_PATTERN
+
+        if self.scroll_px == 0:
+            scroll_behavior = "none"
+        elif self.scroll_px < SCROLL_SHORT_PX:
+            scroll_behavior = "short"
+        elif self.scroll_px < SCROLL_LONG_PX:
+            scroll_behavior = "medium"
+        else:
+            scroll_behavior = "long"
+
+        # Form filling runs from the first keystroke to submit (or the last keystroke)
+        form_fill_time = 0.0
+        if self.first_key_t is not None:
+            form_end = self.submit_t if self.submit_t is not None else self.last_key_t
+            form_fill_time = max(form_end - self.first_key_t, 0.0)
+
+        return [
+            self.mouse_px / MOUSE_UNIT_PX,
+            typing_speed,
+            click_pattern,
+            time_spent,
+            scroll_behavior,
+            self.captcha_success,
+            form_fill_time,
+        ]
+
+class SessionStore:
+    """
+    Bounded map of session key -> SessionAccumulator. Sessions idle for more
+    than `ttl_sec` expire, and the least recently updated session is evicted
+    once `max_sessions` is reached.
+    """
+
+    def __init__(self, max_sessions=100_000, ttl_sec=1800):
+        self.max_sessions = max_sessions
+        self.ttl_sec = ttl_sec
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        # Oldest-updated sessions are at the front, so stop at the first live one
+        while self._sessions:
+            key, (updated, _) = next(iter(self._sessions.items()))
+            if now - updated <= self.ttl_sec:
+                break
+            self._sessions.popitem(last=False)
+
+    def add_events(self, key, events, now=None):
+        """
+        Fold a batch of events into the session's accumulator in timestamp
+        order. Returns the accumulator and the number of events accepted.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.pop(key, None)
+            acc = entry[1] if entry else SessionAccumulator()
+            accepted = sum(acc.add(event) for event in sorted(events, key=lambda event: event.t))
+            self._sessions[key] = (now, acc)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return acc, accepted
+
+    def get(self, key, now=None):
+        """Accumulator for `key`, or None if unknown or expired"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(key)
+        return entry[1] if entry else None
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,226 @@
+"""
+Synthetic session generator.
+
+Produces labelled human and bot sessions in the same schema as the training
+CSV (the 7 features plus `is_bot`), fully vectorized with NumPy and streamed
+in chunks so millions of rows can be written without holding them in memory.
+
+Usage:
+    python session_generator.py --rows 5000000 --out synthetic_sessions.csv
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+SCROLL_BEHAVIORS = ["long", "medium", "none", "short"]
+
+FEATURES = ['mouse_movement_units', 'typing_speed_cpm', 'click_pattern_score',
+            'time_spent_on_page_sec', 'scroll_behavior', 'captcha_success',
+            'form_fill_time_sec']
+
+# Valid range for every numeric feature, applied after sampling
+FEATURE_BOUNDS = {
+    'mouse_movement_units': (0.0, None),
+    'typing_speed_cpm': (0.0, None),
+    'click_pattern_score': (0.0, 1.0),
+    'time_spent_on_page_sec': (0.1, None),
+    'form_fill_time_sec': (0.1, None),
+}
+
+# Per-class distributions. Numeric features are (distribution, *params) with
+# distribution one of "normal" (mean, std), "lognormal" (mean, sigma of the
+# underlying normal), "uniform" (low, high) or "beta" (a, b).
+# `scroll_behavior` gives the probability of each entry in SCROLL_BEHAVIORS
+# and `captcha_success` the probability of passing the CAPTCHA.
+PERSONAS = {
+    "human": {
+        "is_bot": 0,
+        "mouse_movement_units": ("lognormal", 3.6, 0.4),
+        "typing_speed_cpm": ("normal", 230.0, 60.0),
+        "click_pattern_score": ("beta", 8.0, 2.0),
+        "time_spent_on_page_sec": ("lognormal", 3.6, 0.5),
+        "scroll_behavior": [0.35, 0.4, 0.05, 0.2],
+        "captcha_success": 0.95,
+        "form_fill_time_sec": ("lognormal", 3.7, 0.5),
+    },
+    # Plain scripts: almost no mouse movement, instant typing and form filling
+    "scripted": {
+        "is_bot": 1,
+        "mouse_movement_units": ("uniform", 0.0, 3.0),
+        "typing_speed_cpm": ("normal", 1800.0, 400.0),
+        "click_pattern_score": ("beta", 1.5, 12.0),
+        "time_spent_on_page_sec": ("uniform", 0.5, 4.0),
+        "scroll_behavior": [0.0, 0.0, 0.9, 0.1],
+        "captcha_success": 0.2,
+        "form_fill_time_sec": ("uniform", 0.2, 2.0),
+    },
+    # Headless browsers driven by automation frameworks
+    "headless": {
+        "is_bot": 1,
+        "mouse_movement_units": ("lognormal", 1.6, 0.3),
+        "typing_speed_cpm": ("normal", 880.0, 60.0),
+        "click_pattern_score": ("beta", 2.0, 8.0),
+        "time_spent_on_page_sec": ("uniform", 1.5, 6.0),
+        "scroll_behavior": [0.0, 0.05, 0.7, 0.25],
+        "captcha_success": 0.5,
+        "form_fill_time_sec": ("uniform", 1.0, 4.0),
+    },
+    # Bots that add jitter and delays to look like people. Every feature
+    # overlaps the human distribution, only slightly shifted towards bots.
+    "human_emulating": {
+        "is_bot": 1,
+        "mouse_movement_units": ("lognormal", 3.3, 0.5),
+        "typing_speed_cpm": ("normal", 290.0, 90.0),
+        "click_pattern_score": ("beta", 6.0, 2.5),
+        "time_spent_on_page_sec": ("lognormal", 3.3, 0.5),
+        "scroll_behavior": [0.3, 0.4, 0.1, 0.2],
+        "captcha_success": 0.9,
+        "form_fill_time_sec": ("lognormal", 3.3, 0.5),
+    },
+}
+
+# Share of each persona in the generated traffic
+PERSONA_WEIGHTS = {
+    "human": 0.7,
+    "scripted": 0.1,
+    "headless": 0.1,
+    "human_emulating": 0.1,
+}
+
+PERSONA_KEYS = {"is_bot", "scroll_behavior", "captcha_success", *FEATURE_BOUNDS}
+
+def merge_config(config, personas=PERSONAS, weights=PERSONA_WEIGHTS):
+    """
+    Apply a {"personas": ..., "weights": ...} override on top of the defaults.
+    Persona overrides are merged key by key, so a partial override only
+    replaces the distributions it names. Weights replace the defaults.
+    """
+    merged = {name: dict(persona) for name, persona in personas.items()}
+    for name, overrides in config.get("personas", {}).items():
+        merged.setdefault(name, {}).update(overrides)
+    return merged, dict(config.get("weights", weights))
+
+def check_personas(personas, weights):
+    """Raise ValueError unless every weighted persona is fully specified and vice versa"""
+    if set(personas) != set(weights):
+        raise ValueError(f"Personas and weights must name the same personas: "
+                         f"{sorted(personas)} vs {sorted(weights)}")
+    for name, persona in personas.items():
+        missing = PERSONA_KEYS - set(persona)
+        if missing:
+            raise ValueError(f"Persona {name!r} is missing {sorted(missing)}")
+
+def _sample(rng, spec, size):
+    """Draw `size` values from a (distribution, *params) spec"""
+    kind, *params = spec
+    if kind == "normal":
+        return rng.normal(params[0], params[1], size)
+    if kind == "lognormal":
+        return rng.lognormal(params[0], params[1], size)
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1], size)
+    if kind == "beta":
+        return rng.beta(params[0], params[1], size)
+    raise ValueError(f"Unknown distribution: {kind}")
+
+def generate_chunk(rng, size, personas=PERSONAS, weights=PERSONA_WEIGHTS,
+                   include_persona=False):
+    """Generate one DataFrame of `size` sessions"""
+    names = list(weights)
+    p = np.array([weights[name] for name in names], dtype=float)
+    persona_idx = rng.choice(len(names), size=size, p=p / p.sum())
+
+    numeric = [f for f in FEATURES if f in FEATURE_BOUNDS]
+    columns = {f: np.empty(size, dtype=np.float32) for f in numeric}
+    scroll_idx = np.empty(size, dtype=np.int8)
+    captcha = np.empty(size, dtype=np.int8)
+    is_bot = np.empty(size, dtype=np.int8)
+
+    for i, name in enumerate(names):
+        mask = persona_idx == i
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        persona = personas[name]
+        for f in numeric:
+            columns[f][mask] = _sample(rng, persona[f], count)
+        scroll_p = np.asarray(persona["scroll_behavior"], dtype=float)
+        scroll_idx[mask] = rng.choice(len(SCROLL_BEHAVIORS), size=count, p=scroll_p / scroll_p.sum())
+        captcha[mask] = rng.random(count) < persona["captcha_success"]
+        is_bot[mask] = persona["is_bot"]
+
+    for f, (low, high) in FEATURE_BOUNDS.items():
+        np.clip(columns[f], low, high, out=columns[f])
+        np.round(columns[f], 3, out=columns[f])
+
+    df = pd.DataFrame({
+        'mouse_movement_units': columns['mouse_movement_units'],
+        'typing_speed_cpm': columns['typing_speed_cpm'],
+        'click_pattern_score': columns['click_pattern_score'],
+        'time_spent_on_page_sec': columns['time_spent_on_page_sec'],
+        'scroll_behavior': pd.Categorical.from_codes(scroll_idx, SCROLL_BEHAVIORS),
+        'captcha_success': captcha,
+        'form_fill_time_sec': columns['form_fill_time_sec'],
+        'is_bot': is_bot,
+    })
+    if include_persona:
+        df['persona'] = pd.Categorical.from_codes(persona_idx.astype(np.int8), names)
+    return df
+
+def generate_sessions(n_rows, seed=42, chunk_size=500_000, personas=PERSONAS,
+                      weights=PERSONA_WEIGHTS, include_persona=False):
+    """
+    Yield DataFrames of at most `chunk_size` sessions until `n_rows` are produced.
+    Each chunk gets its own child seed, so output is reproducible for a given
+    seed and chunk size.
+    """
+    check_personas(personas, weights)
+    children = np.random.SeedSequence(seed).spawn((n_rows + chunk_size - 1) // chunk_size)
+    remaining = n_rows
+    for child in children:
+        size = min(chunk_size, remaining)
+        yield generate_chunk(np.random.default_rng(child), size, personas, weights, include_persona)
+        remaining -= size
+
+def write_csv(path, n_rows, seed=42, chunk_size=500_000, personas=PERSONAS,
+              weights=PERSONA_WEIGHTS, include_persona=False):
+    """Stream generated sessions to a CSV file, one chunk at a time"""
+    written = 0
+    for i, chunk in enumerate(generate_sessions(n_rows, seed, chunk_size, personas,
+                                                weights, include_persona)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        written += len(chunk)
+    if written == 0:
+        # Still produce a valid (header-only) CSV
+        columns = FEATURES + ['is_bot'] + (['persona'] if include_persona else [])
+        pd.DataFrame(columns=columns).to_csv(path, index=False)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic human and bot sessions")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of sessions to generate")
+    parser.add_argument("--out", default="synthetic_sessions.csv", help="Output CSV path")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Rows generated per chunk")
+    parser.add_argument("--config", help="JSON file with 'personas' and/or 'weights' overrides")
+    parser.add_argument("--include-persona", action="store_true", help="Add a persona column")
+    args = parser.parse_args()
+
+    personas, weights = PERSONAS, PERSONA_WEIGHTS
+    if args.config:
+        with open(args.config) as f:
+            personas, weights = merge_config(json.load(f))
+    try:
+        check_personas(personas, weights)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    written = write_csv(args.out, args.rows, args.seed, args.chunk_size, personas,
+                        weights, args.include_persona)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {written:,} sessions to {args.out} in {elapsed:.1f}s "
+          f"({written / max(elapsed, 1e-9):,.0f} rows/s)")
@@ -0,0 +1,130 @@
+"""
+Cross-session swarm detection.
+
+Bot farms run the same script from many sessions, so their quantized feature
+vectors repeat across clients. SwarmDetector counts quantized fingerprints in
+a sliding time window with a count-min sketch split into time buckets, and
+tracks the most frequent fingerprints in a bounded heavy-hitters table.
+Work per session and memory are fixed no matter how much traffic comes in.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+# Quantization step per feature, in SessionData order. Scroll behavior and
+# CAPTCHA success are already discrete.
+QUANTIZATION_STEPS = {
+    'mouse_movement_units': 1.0,
+    'typing_speed_cpm': 25.0,
+    'click_pattern_score': 0.05,
+    'time_spent_on_page_sec': 1.0,
+    'scroll_behavior_encoded': 1,
+    'captcha_success': 1,
+    'form_fill_time_sec': 0.5,
+}
+
+_MASK32 = (1 << 32) - 1
+
+def fingerprint(features):
+    """Quantize a 7-feature vector (SessionData order) into a hashable fingerprint"""
+    return tuple(int(round(value / step)) for value, step in zip(features, QUANTIZATION_STEPS.values()))
+
+def describe_fingerprint(fp):
+    """Map a fingerprint back to the feature values at the center of its bins"""
+    return {name: round(code * step, 4) for (name, step), code in zip(QUANTIZATION_STEPS.items(), fp)}
+
+class SwarmDetector:
+    """
+    Count-min sketch over a sliding window of `window_sec`, split into
+    `buckets` sub-windows. A running total sketch is kept so estimates only
+    read `depth` cells, and expired sub-windows are subtracted on rotation.
+    """
+
+    def __init__(self, window_sec=300, buckets=10, width=2048, depth=4,
+                 top_k=50, threshold=20):
+        self.window_sec = window_sec
+        self.bucket_sec = window_sec / buckets
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.threshold = threshold
+        self._buckets = np.zeros((buckets, depth, width), dtype=np.int32)
+        self._total = np.zeros((depth, width), dtype=np.int32)
+        self._rows = np.arange(depth)
+        self._current = int(time.monotonic() // self.bucket_sec)
+        # Heavy-hitter candidates: fingerprint -> last estimated count
+        self._heavy = {}
+        self._lock = threading.Lock()
+
+    def _columns(self, fp):
+        # Double hashing gives `depth` independent-enough columns from one hash
+        h = hash(fp) & ((1 << 64) - 1)
+        h1, h2 = h & _MASK32, (h >> 32) | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def _rotate(self, now):
+        current = int(now // self.bucket_sec)
+        steps = min(current - self._current, len(self._buckets))
+        for i in range(1, steps + 1):
+            expired = (self._current + i) % len(self._buckets)
+            self._total -= self._buckets[expired]
+            self._buckets[expired] = 0
+        if steps > 0:
+            self._current = current
+
+    def _estimate(self, fp):
+        # Caller holds the lock
+        return int(self._total[self._rows, self._columns(fp)].min())
+
+    def add(self, features, now=None):
+        """
+        Count one session and return the estimated frequency of its fingerprint
+        in the window. Sessions with non-finite features are not counted (0).
+        """
+        if not all(math.isfinite(value) for value in features):
+            return 0
+        fp = fingerprint(features)
+        cols = self._columns(fp)
+        with self._lock:
+            self._rotate(time.monotonic() if now is None else now)
+            bucket = self._current % len(self._buckets)
+            self._buckets[bucket, self._rows, cols] += 1
+            self._total[self._rows, cols] += 1
+            count = int(self._total[self._rows, cols].min())
+
+            # Keep the table bounded: prune back to top_k once it doubles, ranking
+            # by fresh window estimates so stale heavy hitters don't crowd out live ones
+            self._heavy[fp] = count
+            if len(self._heavy) > 2 * self.top_k:
+                fresh = ((candidate, self._estimate(candidate)) for candidate in self._heavy)
+                kept = sorted(fresh, key=lambda item: item[1], reverse=True)[:self.top_k]
+                self._heavy = {candidate: c for candidate, c in kept if c > 0}
+        return count
+
+    def estimate(self, fp, now=None):
+        """Estimated frequency of a fingerprint in the window, without counting it"""
+        with self._lock:
+            self._rotate(time.monotonic() if now is None else now)
+            return self._estimate(fp)
+
+    def is_coordinated(self, count):
+        return count >= self.threshold
+
+    def top(self, limit=None, now=None):
+        """Most frequent fingerprints in the current window, with fresh estimates"""
+        with self._lock:
+            self._rotate(time.monotonic() if now is None else now)
+            counts = {fp: self._estimate(fp) for fp in self._heavy}
+            self._heavy = {fp: count for fp, count in counts.items() if count > 0}
+        ranked = sorted(self._heavy.items(), key=lambda item: item[1], reverse=True)
+        return [
+            {
+                "fingerprint": list(fp),
+                "features": describe_fingerprint(fp),
+                "count": count,
+                "coordinated": self.is_coordinated(count),
+            }
+            for fp, count in ranked[:limit or self.top_k]
+        ]
@@ -0,0 +1,191 @@
+"""
+Out-of-core training on large session archives.
+
+Streams the CSV in chunks with compact dtypes (float32 features, int8 labels,
+categorical scroll behavior), builds the `scroll_behavior` encoding in the same
+pass, and trains either a histogram-based gradient boosting model or a random
+forest that subsamples rows for every tree. The model and encoder are saved in
+the same format the API loads (MODEL_PATH / ENCODER_PATH).
+
+Usage:
+    python train_large.py --data synthetic_sessions.csv --model hist_gb
+"""
+import argparse
+import resource
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import classification_report
+from sklearn.preprocessing import LabelEncoder
+
+# Same feature order as the API
+FEATURES = ['mouse_movement_units', 'typing_speed_cpm', 'click_pattern_score',
+            'time_spent_on_page_sec', 'scroll_behavior_encoded', 'captcha_success',
+            'form_fill_time_sec']
+
+# Compact dtypes used while streaming the CSV
+CSV_DTYPES = {
+    'mouse_movement_units': np.float32,
+    'typing_speed_cpm': np.float32,
+    'click_pattern_score': np.float32,
+    'time_spent_on_page_sec': np.float32,
+    'scroll_behavior': 'category',
+    'captcha_success': np.float32,
+    'form_fill_time_sec': np.float32,
+    'is_bot': np.float32,
+}
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _stack(chunks, columns=None, dtype=np.float32):
+    """
+    Copy chunks into one array, freeing each chunk as soon as it is copied.
+    Pages of the result are only touched as they are written, so peak memory
+    stays close to the size of the result plus one chunk.
+    """
+    rows = sum(len(c) for c in chunks)
+    out = np.empty((rows, columns) if columns else rows, dtype=dtype)
+    lo = 0
+    chunks.reverse()
+    while chunks:
+        c = chunks.pop()
+        out[lo:lo + len(c)] = c
+        lo += len(c)
+    return out
+
+def load_compact(path, chunk_size=500_000, test_size=0.2, random_state=42):
+    """
+    Read the CSV chunk by chunk into float32 feature and int8 label arrays,
+    splitting each chunk into train and hold-out rows as it is read so the
+    full matrix is never copied.
+    Scroll behavior labels are given codes as they are first seen and remapped
+    to sorted order at the end, so the result matches a fitted LabelEncoder.
+    Rows without a label are skipped.
+    Returns (X_train, y_train, X_test, y_test, encoder).
+    """
+    rng = np.random.default_rng(random_state)
+    label_codes = {}
+    parts = {"x_train": [], "y_train": [], "x_test": [], "y_test": []}
+
+    for chunk in pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES,
+                             chunksize=chunk_size):
+        chunk = chunk.dropna(subset=['is_bot', 'scroll_behavior'])
+        if chunk.empty:
+            continue
+
+        # Map this chunk's categories onto the running label codes
+        scroll = chunk['scroll_behavior'].cat.remove_unused_categories()
+        lookup = np.array([label_codes.setdefault(label, len(label_codes))
+                           for label in scroll.cat.categories], dtype=np.float32)
+
+        x = np.empty((len(chunk), len(FEATURES)), dtype=np.float32)
+        x[:, 0] = chunk['mouse_movement_units'].to_numpy()
+        x[:, 1] = chunk['typing_speed_cpm'].to_numpy()
+        x[:, 2] = chunk['click_pattern_score'].to_numpy()
+        x[:, 3] = chunk['time_spent_on_page_sec'].to_numpy()
+        x[:, 4] = lookup[scroll.cat.codes.to_numpy()]
+        x[:, 5] = chunk['captcha_success'].to_numpy()
+        x[:, 6] = chunk['form_fill_time_sec'].to_numpy()
+        y = chunk['is_bot'].to_numpy().astype(np.int8)
+
+        # Random hold-out split, one chunk at a time
+        test_mask = rng.random(len(y)) < test_size
+        parts["x_train"].append(x[~test_mask])
+        parts["y_train"].append(y[~test_mask])
+        parts["x_test"].append(x[test_mask])
+        parts["y_test"].append(y[test_mask])
+
+    if not parts["y_train"] or not sum(len(c) for c in parts["y_train"]):
+        raise ValueError(f"No labelled training rows found in {path}")
+
+    X_train = _stack(parts["x_train"], len(FEATURES))
+    y_train = _stack(parts["y_train"], dtype=np.int8)
+    X_test = _stack(parts["x_test"], len(FEATURES))
+    y_test = _stack(parts["y_test"], dtype=np.int8)
+
+    # Remap first-seen codes to the sorted order LabelEncoder uses
+    encoder = LabelEncoder()
+    encoder.classes_ = np.array(sorted(label_codes), dtype=object)
+    remap = np.empty(len(label_codes), dtype=np.float32)
+    for label, code in label_codes.items():
+        remap[code] = np.searchsorted(encoder.classes_, label)
+    for X in (X_train, X_test):
+        X[:, 4] = remap[X[:, 4].astype(np.intp)]
+
+    return X_train, y_train, X_test, y_test, encoder
+
+def build_model(kind, max_samples, random_state=42):
+    """Create the classifier for the requested training mode"""
+    if kind == "hist_gb":
+        return HistGradientBoostingClassifier(
+            max_iter=200,
+            categorical_features=[FEATURES.index('scroll_behavior_encoded')],
+            early_stopping=True,
+            random_state=random_state,
+        )
+    if kind == "forest":
+        # Each tree only sees a bootstrap subsample, which bounds fit time and
+        # memory per tree on large archives
+        return RandomForestClassifier(
+            n_estimators=100,
+            max_samples=max_samples,
+            n_jobs=-1,
+            random_state=random_state,
+        )
+    raise ValueError(f"Unknown model type: {kind}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the bot detector on large session archives")
+    parser.add_argument("--data", required=True, help="CSV with session features and is_bot labels")
+    parser.add_argument("--model", choices=["hist_gb", "forest"], default="hist_gb",
+                        help="Histogram gradient boosting or subsample-per-tree random forest")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Rows read per chunk")
+    parser.add_argument("--max-samples", type=float, default=0.1,
+                        help="Fraction of rows each forest tree is trained on")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Fraction of rows held out")
+    parser.add_argument("--model-out", default="bot_model_large.pkl", help="Where to save the model")
+    parser.add_argument("--encoder-out", default="scroll_behavior_encoder_large.pkl",
+                        help="Where to save the scroll behavior encoder")
+    args = parser.parse_args()
+
+    timings = {}
+    start = time.perf_counter()
+    X_train, y_train, X_test, y_test, le = load_compact(args.data, args.chunk_size, args.test_size)
+    timings["load"] = time.perf_counter() - start
+    load_peak_mb = peak_memory_mb()
+    print(f"Loaded {len(y_train) + len(y_test):,} sessions "
+          f"({(X_train.nbytes + X_test.nbytes) / 1e6:.1f} MB of features, {len(y_test):,} held out), "
+          f"scroll behaviors: {list(le.classes_)}")
+
+    start = time.perf_counter()
+    model = build_model(args.model, args.max_samples)
+    model.fit(X_train, y_train)
+    timings["fit"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    timings["evaluate"] = time.perf_counter() - start
+
+    print("\nModel Performance Report:")
+    print("------------------------")
+    print(classification_report(y_test, y_pred))
+
+    joblib.dump(model, args.model_out)
+    joblib.dump(le, args.encoder_out)
+
+    print("Resource Usage:")
+    print("---------------")
+    for stage, seconds in timings.items():
+        print(f"{stage:>10}: {seconds:.1f}s")
+    print(f"{'total':>10}: {sum(timings.values()):.1f}s")
+    print(f"{'peak RSS':>10}: {peak_memory_mb():.0f} MB ({load_peak_mb:.0f} MB after load)")
+    print(f"✅ Model saved to {args.model_out} and encoder to {args.encoder_out}")
+    print(f"   Serve it with MODEL_PATH={args.model_out} ENCODER_PATH={args.encoder_out}")